@@ -4,9 +4,11 @@ OpenAI Agents接続確認用の最小限のテストスクリプト
 ログやエラーハンドリングは必要最低限とする
 """
 
-from logging import INFO, Formatter, Logger, StreamHandler, getLogger
-from logging.handlers import RotatingFileHandler
+import atexit
+from logging import INFO, Formatter, LogRecord, Logger, StreamHandler, getLogger
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from queue import SimpleQueue
 
 
 def get_logger(name: str, log_file: str) -> Logger:
@@ -29,7 +31,6 @@ def get_logger(name: str, log_file: str) -> Logger:
     console_handler = StreamHandler()
     console_handler.setFormatter(formatter)
     console_handler.setLevel(INFO)
-    logger.addHandler(console_handler)
 
     # ファイルハンドラーの設定
     # ログファイルのディレクトリを作成
@@ -45,7 +46,15 @@ def get_logger(name: str, log_file: str) -> Logger:
     )
     file_handler.setFormatter(formatter)
     file_handler.setLevel(INFO)
-    logger.addHandler(file_handler)
+
+    # 出力はQueueListenerのスレッドで行い、呼び出し元をI/Oで止めないようにする
+    queue: SimpleQueue[LogRecord] = SimpleQueue()
+    listener = QueueListener(
+        queue, console_handler, file_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(QueueHandler(queue))
 
     # ロガーのレベル設定
     logger.setLevel(INFO)
@@ -6,6 +6,9 @@ OpenAI Agents接続確認用の最小限のテストスクリプト
 
 import asyncio
 import os
+import sys
+from collections.abc import Callable
+from logging import Logger
 
 from agents.realtime import RealtimeAgent, RealtimeModelConfig, RealtimeRunner
 from agents.realtime.events import (
@@ -21,6 +24,49 @@ from dotenv import load_dotenv
 
 from experiment.log import get_logger
 
+if sys.platform == "win32":
+    # uvloopはWindowsに対応していないため、標準のイベントループを使う
+    from asyncio import run
+else:
+    from uvloop import run
+
+EventHandler = Callable[[object, Logger], None]
+
+
+def _printer(message: str) -> EventHandler:
+    """メッセージを表示するだけのハンドラーを作成する"""
+
+    def handle(event: object, logger: Logger) -> None:
+        print(message)
+
+    return handle
+
+
+def _handle_raw_model_event(event: object, logger: Logger) -> None:
+    print("🔄 Raw model event:")
+    logger.info(event)
+
+
+# イベントの型ごとの処理（型で辞書を引いて分岐する）
+EVENT_HANDLERS: dict[type, EventHandler] = {
+    RealtimeAgentStartEvent: _printer("✅ Connection established successfully."),
+    RealtimeAgentEndEvent: _printer("✅ Agent finished responding."),
+    RealtimeAudio: _printer("🎤 Received audio chunk of size"),
+    RealtimeAudioEnd: _printer("✅ Audio response ended."),
+    RealtimeHistoryAdded: _printer("📝 History added."),
+    RealtimeHistoryUpdated: _printer("📝 History updated."),
+    RealtimeRawModelEvent: _handle_raw_model_event,
+}
+
+
+def _find_handler(event: object) -> EventHandler | None:
+    """イベントの型に対応するハンドラーを返す (match/caseと同様に派生クラスも対象)"""
+    for cls in type(event).__mro__:
+        handler = EVENT_HANDLERS.get(cls)
+        if handler is not None:
+            return handler
+    return None
+
 
 async def test_connection():
     logger = get_logger("connection_test", "logs/connection_test.log")
@@ -43,25 +89,12 @@ async def test_connection():
         try:
             async with asyncio.timeout(timeout):
                 async for event in session:
-                    match event:
-                        case RealtimeAgentStartEvent():
-                            print("✅ Connection established successfully.")
-                        case RealtimeAgentEndEvent():
-                            print("✅ Agent finished responding.")
-                        case RealtimeAudio():
-                            print("🎤 Received audio chunk of size")
-                        case RealtimeAudioEnd():
-                            print("✅ Audio response ended.")
-                        case RealtimeHistoryAdded():
-                            print("📝 History added.")
-                        case RealtimeHistoryUpdated():
-                            print("📝 History updated.")
-                        case RealtimeRawModelEvent():
-                            print("🔄 Raw model event:")
-                            logger.info(event)
-                        case _:
-                            print(f"Received event: {event}")
-                            raise ValueError(f"Unexpected event type: {type(event)}")
+                    handler = _find_handler(event)
+                    if handler is None:
+                        print(f"Received event: {event}")
+                        raise ValueError(f"Unexpected event type: {type(event)}")
+
+                    handler(event, logger)
         except asyncio.TimeoutError:
             return False
 
@@ -76,5 +109,5 @@ async def test_connection():
 
 
 if __name__ == "__main__":
-    result = asyncio.run(test_connection())
+    result = run(test_connection())
     exit(0 if result else 1)
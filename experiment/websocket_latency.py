@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+WebSocketサーバーの遅延計測用スクリプト
+1本の接続で正弦波を20msごとのフレームとして送り続け、送信から応答までの遅延を計測する
+サーバー側でフレームが結合・破棄されても送受信のバイト位置で対応付けるが、
+破棄が発生した場合は計測結果がずれる
+"""
+
+import asyncio
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import numpy.typing as npt
+import websockets
+
+if sys.platform == "win32":
+    # uvloopはWindowsに対応していないため、標準のイベントループを使う
+    from asyncio import run
+else:
+    from uvloop import run
+
+WS_SERVER_URL = "ws://localhost:8000/realtime"
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 320  # 20ms
+DURATION = 10.0  # 秒
+
+
+def generate_sine(frequency: float, duration: float) -> npt.NDArray[np.int16]:
+    t = np.arange(int(SAMPLE_RATE * duration)) / SAMPLE_RATE
+    return (np.sin(2 * np.pi * frequency * t) * 0.3 * 32767).astype(np.int16)
+
+
+async def send_frames(
+    websocket: websockets.ClientConnection,
+    audio: npt.NDArray[np.int16],
+    sent: deque[tuple[int, float]],
+) -> None:
+    frame_duration = FRAME_SAMPLES / SAMPLE_RATE
+    start = time.monotonic()
+    offset = 0
+    for i in range(0, len(audio), FRAME_SAMPLES):
+        # 経過時間の基準を固定し、sleepの誤差が積み重ならないようにする
+        delay = start + (i // FRAME_SAMPLES) * frame_duration - time.monotonic()
+        await asyncio.sleep(max(0.0, delay))
+
+        frame = audio[i : i + FRAME_SAMPLES].tobytes()
+        offset += len(frame)
+        sent.append((offset, time.monotonic()))
+        await websocket.send(frame)
+
+
+async def receive_frames(
+    websocket: websockets.ClientConnection,
+    total_bytes: int,
+    sent: deque[tuple[int, float]],
+    latencies: list[float],
+) -> None:
+    received = 0
+    while received < total_bytes:
+        message = await websocket.recv()
+        now = time.monotonic()
+        received += len(message)
+        # 受信済みのバイト位置までに送ったフレームの遅延を記録する
+        while sent and sent[0][0] <= received:
+            _, sent_at = sent.popleft()
+            latencies.append(now - sent_at)
+
+
+async def measure_latency(url: str) -> None:
+    audio = generate_sine(440.0, DURATION)
+    sent: deque[tuple[int, float]] = deque()
+    latencies: list[float] = []
+
+    async with websockets.connect(url, compression=None) as websocket:
+        try:
+            async with asyncio.timeout(DURATION + 5.0):
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(send_frames(websocket, audio, sent))
+                    tg.create_task(
+                        receive_frames(websocket, audio.nbytes, sent, latencies)
+                    )
+        except TimeoutError:
+            print("⚠️  Timed out before all frames were received.")
+
+    if not latencies:
+        print("❌ No response received.")
+        return
+
+    result = np.array(latencies) * 1000
+    print(f"frames: {len(result)} / {-(-len(audio) // FRAME_SAMPLES)}")
+    print(f"mean: {result.mean():.2f} ms")
+    print(f"p50 : {np.percentile(result, 50):.2f} ms")
+    print(f"p99 : {np.percentile(result, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    run(measure_latency(WS_SERVER_URL))
@@ -1,5 +1,7 @@
 import asyncio
+import contextlib
 import os
+from collections.abc import AsyncIterator
 
 import numpy as np
 import numpy.typing as npt
@@ -16,13 +18,32 @@ from src.core.log import get_logger
 
 logger = get_logger(__name__)
 
+# 2倍にしてもint16に収まるサンプル値の範囲
+_DOUBLE_MIN = -(2**14)
+_DOUBLE_MAX = 2**14 - 1
+_INT16_MAX = np.iinfo(np.int16).max
+
+# 中断した応答の残りのイベントを読み捨てる際に待つ最大時間（秒）
+_DISCARD_TIMEOUT = 1.0
+
 
 class TestAgent:
     def __init__(self) -> None:
-        pass
+        # 呼び出しごとに配列を確保しないよう、出力バッファを使い回す
+        # 戻り値はこのバッファのビューなので、次の呼び出しで上書きされる
+        self._buffer = np.empty(0, dtype=np.int16)
 
     async def __call__(self, audio: npt.NDArray[np.int16]) -> npt.NDArray[np.int16]:
-        return audio * 2  # 例: 音量を2倍にする
+        if len(self._buffer) < len(audio):
+            self._buffer = np.empty(len(audio), dtype=np.int16)
+        doubled = self._buffer[: len(audio)]
+
+        # 例: 音量を2倍にする (int16の範囲を超えるサンプルは折り返さず飽和させる)
+        np.clip(audio, _DOUBLE_MIN, _DOUBLE_MAX, out=doubled)
+        np.left_shift(doubled, 1, out=doubled)
+        # 正側は2倍すると偶数の32766が上限になるため、範囲を超えたサンプルは32767にする
+        np.copyto(doubled, _INT16_MAX, where=audio > _DOUBLE_MAX)
+        return doubled
 
 
 class SimpleAgent:
@@ -53,80 +74,121 @@ class SimpleAgent:
             playback_tracker=RealtimePlaybackTracker(),
         )
 
-        # セッションを初期化時に作成し、再利用する
+        # セッションは初回呼び出し時に作成し、以降の呼び出しで再利用する
         self.runner: RealtimeRunner | None = None
         self.session: RealtimeSession | None = None
+        # 同時に呼び出されてもセッションを二重に作成しないためのロック
+        self._session_lock = asyncio.Lock()
 
     async def _initialize_session(self) -> None:
         """セッションを初期化する"""
-        if self.runner is None:
-            self.runner = RealtimeRunner(starting_agent=self.agent)
-            self.session = await self.runner.run(model_config=self.config)
-        elif self.session is None:
-            self.session = await self.runner.run(model_config=self.config)
-
-    async def __call__(self, audio: npt.NDArray[np.int16]) -> npt.NDArray[np.int16]:
+        async with self._session_lock:
+            if self.session is not None:
+                return
+
+            if self.runner is None:
+                self.runner = RealtimeRunner(starting_agent=self.agent)
+            session = await self.runner.run(model_config=self.config)
+            # モデルへの接続を確立する (終了時はacloseで閉じる)
+            await session.enter()
+            self.session = session
+
+    async def aclose(self) -> None:
+        """セッションを閉じる"""
+        async with self._session_lock:
+            if self.session is None:
+                return
+
+            session, self.session = self.session, None
+            await session.close()
+
+    async def stream(
+        self, audio: npt.NDArray[np.int16]
+    ) -> AsyncIterator[npt.NDArray[np.int16]]:
+        """
+        音声を送信し、応答音声を受信したチャンクごとに返す
+        応答の途中でジェネレーターを閉じた場合、残りの応答は中断して読み捨てる
+        """
+        # セッションが初期化されていない場合は初期化
+        await self._initialize_session()
+
+        # sessionがNoneでないことを確認
+        if self.session is None:
+            logger.error("セッションの初期化に失敗しました")
+            return
+
+        # numpy配列をbytesに変換
+        audio_bytes = audio.tobytes()
+        await self.session.send_audio(audio_bytes)
+
+        session = self.session
+        # 応答音声の途中かどうか (audio_endを受け取る前に読むのをやめた場合に中断する)
+        responding = False
         try:
-            if len(audio) == 0:
-                return audio
+            async for event in session:
+                logger.debug("SimpleAgent: Received event - %s", event)
+                if event.type == "audio":
+                    responding = True
+                    # event.audio.data はPCM16の生バイト列
+                    yield np.frombuffer(event.audio.data, dtype=np.int16)
+                elif event.type == "audio_end":
+                    responding = False
+                    break
+                elif event.type == "error":
+                    responding = False
+                    logger.error("SimpleAgent: RealtimeAgent error - %s", event.error)
+                    break
+            else:
+                # audio_endやerrorを受け取る前にイベントが途切れた場合は、
+                # セッションが終了しているため閉じておき、次回の呼び出しで再接続する
+                logger.warning("SimpleAgent: セッションが終了しました")
+                await self.aclose()
+        finally:
+            # 呼び出し元が応答の途中で読むのをやめた場合 (早期終了やタイムアウト) は、
+            # 残りの応答が次回の呼び出しに混ざらないよう中断して読み捨てる
+            if responding and self.session is session:
+                with contextlib.suppress(Exception):
+                    await self._discard_response(session)
+
+    async def _discard_response(self, session: RealtimeSession) -> None:
+        """応答を中断し、キューに残っている応答のイベントを読み捨てる"""
+        await session.interrupt()
+        async with asyncio.timeout(_DISCARD_TIMEOUT):
+            async for event in session:
+                if event.type in ("audio_end", "audio_interrupted", "error"):
+                    break
 
-            # セッションが初期化されていない場合は初期化
-            await self._initialize_session()
-
-            # sessionがNoneでないことを確認
-            if self.session is None:
-                logger.error("セッションの初期化に失敗しました")
-                return audio
+    async def __call__(self, audio: npt.NDArray[np.int16]) -> npt.NDArray[np.int16]:
+        # 空の音声はセッションに送らずそのまま返す
+        # 無音はsemantic_vadが発話の終わりを検出するのに必要なため、そのまま送る
+        if audio.size == 0:
+            return audio
 
-            response_audio = np.array([], dtype=np.int16)
+        try:
+            # 受信ごとに連結するとコピー量が二乗で増えるため、
+            # チャンクをリストに溜めておき最後に1度だけ連結する
+            response_chunks: list[npt.NDArray[np.int16]] = []
 
             # タイムアウト付きでセッション処理を実行
             try:
                 async with asyncio.timeout(10.0):  # 10秒のタイムアウト
-                    # numpy配列をbytesに変換
-                    audio_bytes = audio.tobytes()
-                    await self.session.send_audio(audio_bytes)
-
-                    async for event in self.session:
-                        logger.info(f"SimpleAgent: Received event - {event}")
-                        if event.type == "audio":
-                            if hasattr(event, "audio") and event.audio is not None:
-                                # event.audioがbytes型の場合の処理
-                                try:
-                                    # まずbytes型として処理を試みる
-                                    audio_array = np.frombuffer(
-                                        event.audio,
-                                        dtype=np.int16,  # type: ignore
-                                    )
-                                    response_audio = np.concatenate(
-                                        (response_audio, audio_array)
-                                    )
-                                except (TypeError, AttributeError):
-                                    # numpy配列の場合
-                                    response_audio = np.concatenate(
-                                        (response_audio, event.audio)  # type: ignore
-                                    )
-                        elif event.type == "audio_end":
-                            break
-                        elif event.type == "error":
-                            logger.error(
-                                f"SimpleAgent: RealtimeAgent error - {event.error}"
-                            )
-                            break
+                    async for chunk in self.stream(audio):
+                        response_chunks.append(chunk)
 
             except asyncio.TimeoutError:
                 logger.warning("SimpleAgent: タイムアウトが発生しました")
 
             # レスポンスが空の場合は元の音声を返す
-            if len(response_audio) == 0:
+            if not response_chunks:
                 return audio
 
-            return response_audio
+            return np.concatenate(response_chunks)
 
         except Exception as e:
-            import traceback
-
-            logger.error(f"SimpleAgent error: {e}")
-            logger.error(f"SimpleAgent traceback: {traceback.format_exc()}")
+            # トレースバックの整形はログ出力時に行わせる
+            logger.error("SimpleAgent error: %s", e, exc_info=True)
+            # セッションが切断されている可能性があるため、次回の呼び出しで再接続する
+            with contextlib.suppress(Exception):
+                await self.aclose()
             # エラー時は元の音声をそのまま返す
             return audio
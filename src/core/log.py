@@ -1,4 +1,29 @@
-from logging import INFO, Formatter, Logger, StreamHandler, getLogger
+import atexit
+from functools import cache
+from logging import INFO, Formatter, LogRecord, Logger, StreamHandler, getLogger
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+
+
+@cache
+def _get_queue_handler() -> QueueHandler:
+    """
+    全ロガーで共有するQueueHandlerを取得する
+    実際の出力はQueueListenerのスレッドで行い、イベントループをI/Oで止めないようにする
+    """
+    handler = StreamHandler()
+    formatter = Formatter(
+        "%(levelname)s %(asctime)s - %(filename)s:l%(lineno)d - %(message)s",
+        datefmt="%Y%m%d %H:%M:%S",
+    )
+    handler.setFormatter(formatter)
+
+    queue: SimpleQueue[LogRecord] = SimpleQueue()
+    listener = QueueListener(queue, handler)
+    listener.start()
+    # プロセス終了時にキューに残ったログを出力してからスレッドを止める
+    atexit.register(listener.stop)
+    return QueueHandler(queue)
 
 
 def get_logger(name: str) -> Logger:
@@ -8,12 +33,6 @@ def get_logger(name: str) -> Logger:
     """
     logger = getLogger(name)
     if not logger.hasHandlers():
-        handler = StreamHandler()
-        formatter = Formatter(
-            "%(levelname)s %(asctime)s - %(filename)s:l%(lineno)d - %(message)s",
-            datefmt="%Y%m%d %H:%M:%S",
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        logger.addHandler(_get_queue_handler())
         logger.setLevel(INFO)
     return logger
@@ -1,4 +1,6 @@
 import asyncio
+import sys
+from collections import deque
 from dataclasses import dataclass
 from typing import Any
 
@@ -7,36 +9,107 @@ from pyaudio import PyAudio, paInt16
 
 from src.core.log import get_logger
 
+if sys.platform == "win32":
+    # uvloopはWindowsに対応していないため、標準のイベントループを使う
+    from asyncio import run
+else:
+    from uvloop import run
+
 logger = get_logger(__name__)
 
 
-async def send_and_receive_audio(
-    websocket: Any, input_stream: Any, output_stream: Any, chunk: int
+async def capture_audio(
+    input_stream: Any, chunk: int, send_queue: asyncio.Queue[bytes]
 ) -> None:
-    try:
-        while True:
-            # マイクから音声データを取得（バッファオーバーフロー対策）
-            audio_data = input_stream.read(chunk)
+    while True:
+        # マイクから音声データを取得
+        # PortAudioの読み書きはブロッキングなので、イベントループを止めないよう
+        # 別スレッドで実行する
+        audio_data = await asyncio.to_thread(input_stream.read, chunk)
 
-            # WebSocketで音声データを送信
-            await websocket.send(audio_data)
+        # 送信を待たずに次の録音に進めるよう、キューに積むだけにする
+        # 送信が詰まってもマイクの読み取りを止めない (入力バッファを溢れさせない) よう、
+        # キューが一杯の場合は最も古いフレームを捨てる
+        if send_queue.full():
+            send_queue.get_nowait()
+        send_queue.put_nowait(audio_data)
 
-            # サーバーから処理済みの音声データを受信
-            processed_audio = await websocket.recv()
 
-            # 受信したデータを再生
-            output_stream.write(processed_audio)
+async def send_audio(websocket: Any, send_queue: asyncio.Queue[bytes]) -> None:
+    while True:
+        audio_data = await send_queue.get()
 
-    except Exception as e:
-        logger.error(f"エラー: {e}")
+        # WebSocketで音声データを送信
+        await websocket.send(audio_data)
+
+
+class PlaybackBuffer:
+    """受信した音声を再生するまで保持するバッファ（溢れた場合は古いものから捨てる）"""
+
+    def __init__(self, max_frames: int) -> None:
+        self._frames: deque[bytes] = deque(maxlen=max_frames)
+        self._ready = asyncio.Event()
+
+    def push(self, frame: bytes) -> None:
+        self._frames.append(frame)
+        self._ready.set()
+
+    async def pop(self) -> bytes:
+        while not self._frames:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._frames.popleft()
+
+
+async def receive_audio(websocket: Any, playback_buffer: PlaybackBuffer) -> None:
+    while True:
+        # サーバーから処理済みの音声データを受信
+        processed_audio = await websocket.recv()
+
+        # 再生を待たずに次の受信ができるよう、バッファに積むだけにする
+        playback_buffer.push(processed_audio)
+
+
+async def play_audio(output_stream: Any, playback_buffer: PlaybackBuffer) -> None:
+    while True:
+        # 受信したデータを再生
+        processed_audio = await playback_buffer.pop()
+        await asyncio.to_thread(output_stream.write, processed_audio)
+
+
+async def send_and_receive_audio(
+    websocket: Any,
+    input_stream: Any,
+    output_stream: Any,
+    chunk: int,
+    max_send_frames: int,
+    max_playback_frames: int,
+) -> None:
+    send_queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=max_send_frames)
+    playback_buffer = PlaybackBuffer(max_playback_frames)
+
+    # 録音・送信・受信・再生を独立したタスクにして、互いの完了を待たずに進める
+    # いずれかが失敗した場合は残りもキャンセルされる
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(capture_audio(input_stream, chunk, send_queue))
+            tg.create_task(send_audio(websocket, send_queue))
+            tg.create_task(receive_audio(websocket, playback_buffer))
+            tg.create_task(play_audio(output_stream, playback_buffer))
+
+    except* Exception as eg:
+        for e in eg.exceptions:
+            logger.error(f"エラー: {e}")
 
 
-@dataclass
+@dataclass(slots=True)
 class AudioConfig:
     format: int = paInt16
     channels: int = 1
     rate: int = 16000
     chunk: int = 1000  # 1024
+    max_send_frames: int = 8  # 送信待ちで保持する最大フレーム数
+    max_playback_frames: int = 32  # 再生待ちで保持する最大フレーム数
 
 
 async def main(url: str) -> None:
@@ -61,13 +134,16 @@ async def main(url: str) -> None:
     )
 
     logger.info(f"WebSocketサーバーに接続を試行中: {url}")
-    async with websockets.connect(url) as websocket:
+    # PCM音声はほとんど圧縮できないため、permessage-deflateは無効にする
+    async with websockets.connect(url, compression=None, max_size=2**22) as websocket:
         logger.info("WebSocket接続が成功しました")
         await send_and_receive_audio(
             websocket,
             input_stream=input_stream,
             output_stream=output_stream,
             chunk=config.chunk,
+            max_send_frames=config.max_send_frames,
+            max_playback_frames=config.max_playback_frames,
         )
 
 
@@ -76,6 +152,6 @@ if __name__ == "__main__":
     WS_SERVER_URL = "ws://localhost:8000/realtime"
 
     try:
-        asyncio.run(main(WS_SERVER_URL))
+        run(main(WS_SERVER_URL))
     except Exception as e:
         logger.error(e)
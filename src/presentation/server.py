@@ -14,9 +14,22 @@ async def get() -> dict[str, str]:
 
 @app.websocket("/realtime")
 async def websocket_endpoint(websocket: WebSocket) -> None:
+    # TestAgentは出力バッファを使い回し、戻り値はそのビューのため、接続間で共有しない
     audio_service = AudioService(websocket, agent=TestAgent())
     await audio_service()
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True, log_level="info")
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        log_level="info",
+        # uvloopがインストールされていれば使い、Windowsでは標準のイベントループを使う
+        loop="auto",
+        http="httptools",
+        ws="websockets-sansio",
+        # PCM音声はほとんど圧縮できないため、permessage-deflateは無効にする
+        ws_per_message_deflate=False,
+    )
@@ -1,46 +1,178 @@
-import traceback
+import asyncio
+import time
+from logging import DEBUG
 
 import numpy as np
-from fastapi import WebSocket
+import numpy.typing as npt
+from fastapi import WebSocket, WebSocketDisconnect
 
 from src.core.agent import TestAgent
 from src.core.log import get_logger
 
 logger = get_logger(__name__)
 
+# 処理状況の集計ログを出力する間隔（秒）
+STATS_LOG_INTERVAL = 10.0
+# 受信・送信待ちで保持する最大フレーム数
+QUEUE_SIZE = 4
+# エージェントに1度に渡す音声の最大バイト数 (16kHz PCM16で0.5秒)
+MAX_BATCH_BYTES = 16000
+# 処理済み音声をまとめて送信するまでに待つ時間（秒）
+# 0の場合は待たずに、その時点で溜まっている分だけをまとめて送信する
+FLUSH_INTERVAL = 0.0
+# 1フレームにまとめて送信する最大バイト数
+FLUSH_BYTES = 16000
+
+
+def _collect_batch(first: bytes, queue: asyncio.Queue[bytes]) -> list[bytes]:
+    """キューに溜まっているフレームを上限まで取り出し、先頭のフレームとまとめて返す"""
+    frames = [first]
+    nbytes = len(first)
+    while not queue.empty() and nbytes < MAX_BATCH_BYTES:
+        frame = queue.get_nowait()
+        frames.append(frame)
+        nbytes += len(frame)
+    return frames
+
 
 class AudioService:
     def __init__(self, websocket: WebSocket, agent: TestAgent) -> None:
         self.websocket = websocket
         self.agent = agent
+        # 複数フレームをまとめる際の連結先 (呼び出しごとに確保しないよう使い回す)
+        self._batch_buffer = np.empty(0, dtype=np.int16)
+
+        # フレームごとにはログを出さず、件数とバイト数を集計して定期的に出力する
+        self._frames = 0
+        self._bytes = 0
+        self._dropped = 0
+        self._stats_logged_at = time.monotonic()
 
     async def onopen(self) -> None:
         await self.websocket.accept()
         logger.info("WebSocket接続が確立されました")
 
-    async def process_audio(self) -> None:
-        try:
-            while True:
-                logger.info("AudioService: クライアントからのデータを待機中...")
-                data = await self.websocket.receive_bytes()
-                logger.info(f"AudioService: データ受信 - {len(data)} bytes")
-
-                audio_data = np.frombuffer(data, dtype=np.int16)
-                logger.info(
-                    f"AudioService: 音声データ変換完了 - {len(audio_data)} samples"
-                )
+    def _record_frames(self, count: int, nbytes: int) -> None:
+        """処理したフレームを集計し、一定間隔ごとにログに出力する"""
+        self._frames += count
+        self._bytes += nbytes
+
+        if time.monotonic() - self._stats_logged_at >= STATS_LOG_INTERVAL:
+            self._log_stats()
+
+    def _log_stats(self) -> None:
+        """集計中の件数をログに出力し、集計をリセットする"""
+        logger.info(
+            "AudioService: %d frames / %d bytes 処理しました (破棄 %d frames)",
+            self._frames,
+            self._bytes,
+            self._dropped,
+        )
+        self._frames = 0
+        self._bytes = 0
+        self._dropped = 0
+        self._stats_logged_at = time.monotonic()
+
+    def _to_audio(self, frames: list[bytes]) -> npt.NDArray[np.int16]:
+        """受信したフレームをint16の配列として参照する"""
+        if len(frames) == 1:
+            return np.frombuffer(frames[0], dtype=np.int16)
 
-                logger.info("AudioService: エージェント処理開始...")
-                processed_audio = await self.agent(audio_data)
-                logger.info(
-                    f"AudioService: エージェント処理完了 - {len(processed_audio)} samples"  # noqa: E501
+        # 奇数長のフレームを連結するとサンプルの境界がずれるため、
+        # 1フレームの場合 (np.frombuffer) と同様にValueErrorとする
+        if any(len(frame) % 2 for frame in frames):
+            raise ValueError("frame size must be a multiple of int16 element size")
+
+        nsamples = sum(len(frame) for frame in frames) // 2
+        if len(self._batch_buffer) < nsamples:
+            self._batch_buffer = np.empty(nsamples, dtype=np.int16)
+
+        # 使い回すバッファに直接コピーし、連結用のbytesを作らない
+        view = memoryview(self._batch_buffer).cast("B")
+        offset = 0
+        for frame in frames:
+            view[offset : offset + len(frame)] = frame
+            offset += len(frame)
+        return self._batch_buffer[:nsamples]
+
+    async def _receive_loop(self, in_queue: asyncio.Queue[bytes]) -> None:
+        # フレームごとの属性参照を避けるため、ループで使うメソッドを束縛しておく
+        receive_bytes = self.websocket.receive_bytes
+        while True:
+            data = await receive_bytes()
+            # リアルタイム音声では古い入力に価値がないため、
+            # エージェントの処理が追いつかない場合は最も古いフレームを捨てる
+            if in_queue.full():
+                in_queue.get_nowait()
+                self._dropped += 1
+            in_queue.put_nowait(data)
+
+    async def _agent_loop(
+        self, in_queue: asyncio.Queue[bytes], out_queue: asyncio.Queue[bytes]
+    ) -> None:
+        agent = self.agent
+        while True:
+            # 処理中に溜まったフレームはまとめて1回のエージェント呼び出しで処理する
+            frames = _collect_batch(await in_queue.get(), in_queue)
+            audio_data = self._to_audio(frames)
+            processed_audio = await agent(audio_data)
+            # エージェントは出力バッファを使い回すため、キューに積む前にbytesにする
+            await out_queue.put(processed_audio.tobytes())
+
+            self._record_frames(len(frames), audio_data.nbytes)
+            if logger.isEnabledFor(DEBUG):
+                logger.debug(
+                    "AudioService: %d samples 受信 - %d samples 送信",
+                    len(audio_data),
+                    len(processed_audio),
                 )
 
-                await self.websocket.send_bytes(processed_audio.tobytes())
-                logger.info("AudioService: 処理済み音声データを送信完了")
-        except Exception:
-            logger.error(traceback.format_exc())
+    async def _send_loop(self, out_queue: asyncio.Queue[bytes]) -> None:
+        send_bytes = self.websocket.send_bytes
+        while True:
+            chunks = [await out_queue.get()]
+            nbytes = len(chunks[0])
+
+            # FLUSH_INTERVALの間に届いた処理済み音声は1つのフレームにまとめて送る
+            if FLUSH_INTERVAL > 0:
+                try:
+                    async with asyncio.timeout(FLUSH_INTERVAL):
+                        while nbytes < FLUSH_BYTES:
+                            chunk = await out_queue.get()
+                            chunks.append(chunk)
+                            nbytes += len(chunk)
+                except TimeoutError:
+                    pass
+            else:
+                # 待たない場合はタイムアウトを使わず、溜まっている分だけを取り出す
+                while not out_queue.empty() and nbytes < FLUSH_BYTES:
+                    chunk = out_queue.get_nowait()
+                    chunks.append(chunk)
+                    nbytes += len(chunk)
+
+            await send_bytes(chunks[0] if len(chunks) == 1 else b"".join(chunks))
+
+    async def process_audio(self) -> None:
+        # 受信・エージェント処理・送信を別タスクにして、互いの待ち時間を重ねる
+        # 受信キューは溢れた場合に古いものから捨て、遅延が積み上がらないようにする
+        in_queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=QUEUE_SIZE)
+        out_queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=QUEUE_SIZE)
+        logger.info("AudioService: クライアントからのデータを待機中...")
+        try:
+            # いずれかのタスクが終了 (切断やエラー) すると残りもキャンセルされる
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self._receive_loop(in_queue))
+                tg.create_task(self._agent_loop(in_queue, out_queue))
+                tg.create_task(self._send_loop(out_queue))
+        except* WebSocketDisconnect:
+            # クライアントの切断は通常の終了なので、トレースバックは出力しない
+            logger.info("AudioService: クライアントが切断しました")
+        except* Exception:
+            logger.exception("AudioService: 音声処理中にエラーが発生しました")
         finally:
+            # 前回の出力以降に集計した分は、接続終了時にまとめて出力する
+            if self._frames or self._dropped:
+                self._log_stats()
             logger.info("WebSocket接続が閉じられました")
 
     async def __call__(self) -> None: